@@ -1,12 +1,20 @@
 """Patterns common to all vroom components."""
 import sys
 
-try:
-  from ._version import __version__ as __version__
-except ImportError:
-  import warnings
-  warnings.warn('Failed to load __version__ from setuptools-scm')
-  __version__ = '__unknown__'
+
+def __getattr__(name):
+  # Load __version__ lazily (PEP 562) so that merely importing vroom doesn't
+  # pay for the setuptools-scm version file on every CLI invocation.
+  if name == '__version__':
+    try:
+      from ._version import __version__
+    except ImportError:
+      import warnings
+      warnings.warn('Failed to load __version__ from setuptools-scm')
+      __version__ = '__unknown__'
+    globals()['__version__'] = __version__
+    return __version__
+  raise AttributeError('module %r has no attribute %r' % (__name__, name))
 
 
 # Don't even try to run under python 2 or earlier. It will seem to work but fail
@@ -46,11 +54,21 @@ def Specification(*numbered, **named):
       Values: Returns an iterable of all the values.
   """
   enum = dict({n: i for i, n in enumerate(numbered)}, **named)
+  # Spec values are compared all over vroom's hot loops; interning the string
+  # ones lets those comparisons take CPython's pointer-equality fast path.
+  enum = {field: sys.intern(value) if isinstance(value, str) else value
+          for field, value in enum.items()}
   inverted = dict(zip(enum.values(), enum.keys()))
+  fields = tuple(enum.keys())
+  values = tuple(enum.values())
   data = dict(enum)
   data['Lookup'] = inverted.get
-  data['Fields'] = enum.keys
-  data['Values'] = enum.values
+  data['Fields'] = staticmethod(lambda: fields)
+  data['Values'] = staticmethod(lambda: values)
+  # Specifications are only ever used as namespaces of constants; forbidding
+  # instances keeps them small and keeps attribute access a plain class-dict
+  # lookup.
+  data['__slots__'] = ()
   return type('Specification', (), data)
 
 
@@ -5,10 +5,6 @@ import subprocess
 import sys
 
 import vroom.args
-import vroom.color
-import vroom.output
-import vroom.runner
-import vroom.vim
 
 
 def main(argv=None):
@@ -21,6 +17,15 @@ def main(argv=None):
     sys.stderr.write('%s\n' % ', '.join(e.args))
     return 1
 
+  # Deferred until after argument parsing so that bad invocations (and
+  # --help/--version) don't pay the cost of importing the whole runner.
+  # Aliased imports, because 'import vroom.output' would rebind 'vroom' as a
+  # function local and break the vroom.args.Parse call above.
+  # pylint: disable-msg=g-import-not-at-top
+  from vroom import output as vroom_output
+  from vroom import runner as vroom_runner
+  from vroom import vim as vroom_vim
+
   if args.murder:
     try:
       output = subprocess.check_output(['ps', '-A']).decode('utf-8')
@@ -47,12 +52,14 @@ def main(argv=None):
   writers = []
   try:
     for filename in args.filenames:
-      with open(filename) as f:
-        runner = vroom.runner.Vroom(filename, args)
+      # A generous buffer keeps the line-by-line parse from paying per-read
+      # syscall overhead on large vroom files.
+      with open(filename, 'r', buffering=131072) as f:
+        runner = vroom_runner.Vroom(filename, args)
         writers.append(runner(f))
         if runner.dirty:
           dirty = True
-  except vroom.vim.ServerQuit as e:
+  except vroom_vim.ServerQuit as e:
     # If the vim server process fails, the details are probably on stderr, so hope
     # for the best and exit without shell reset.
     sys.stderr.write('Exception: {}\n'.format(e))
@@ -65,9 +72,10 @@ def main(argv=None):
   for writer in writers:
     writer.Write()
 
-  vroom.output.WriteBackmatter(writers, args)
+  vroom_output.WriteBackmatter(writers, args)
 
-  failed_tests = [w for w in writers if w.Status() != vroom.output.STATUS.PASS]
+  failed_tests = [
+      w for w in writers if w.Status() != vroom_output.STATUS.PASS]
   if failed_tests:
     return 3
 
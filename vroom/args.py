@@ -2,20 +2,32 @@
 import argparse
 from argparse import SUPPRESS
 import glob
-import itertools
 import os.path
+import re
 import sys
 
-import vroom
-import vroom.color
-import vroom.messages
-import vroom.shell
-
 parser = argparse.ArgumentParser(
     description='Vroom: launch your tests.',
     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+
+class _VersionAction(argparse.Action):
+  """Prints the version and exits, like action='version'.
+
+  Unlike action='version', the version string is resolved only when --version
+  is actually invoked, so ordinary runs never trigger the setuptools-scm
+  version probe behind vroom.__version__.
+  """
+
+  def __call__(self, _, namespace, values, option_string=None):
+    import vroom  # pylint: disable-msg=g-import-not-at-top
+    sys.stdout.write('%s %s\n' % (parser.prog, vroom.__version__))
+    parser.exit()
+
+
 parser.add_argument(
-    '--version', action='version', version='%(prog)s ' + vroom.__version__)
+    '--version', nargs=0, action=_VersionAction, default=SUPPRESS,
+    help="show program's version number and exit")
 
 
 class DirectoryArg(argparse.Action):
@@ -154,11 +166,13 @@ Neovim.
 #
 # Output configuration
 
+# Output paths are stored as strings and opened in Parse() once the
+# invocation is known to be valid; argparse.FileType would open (and
+# truncate) them during parsing.
 parser.add_argument(
     '-o',
     '--out',
     default=sys.stdout,
-    type=argparse.FileType('w'),
     metavar='FILE',
     help="""
 Write test output to [FILE] instead of STDOUT.
@@ -174,12 +188,15 @@ parser.add_argument(
 Increase the amount of test output.
 """)
 
+# The flag stores a sentinel string rather than the vroom.color callable so
+# that vroom.color (which probes the terminal) is only imported once flags are
+# known. Parse() resolves the sentinel.
 parser.add_argument(
     '--nocolor',
     dest='color',
     action='store_const',
-    const=vroom.color.Colorless,
-    default=vroom.color.Colored,
+    const='colorless',
+    default='colored',
     help="""
 Turn off color in output.
 """)
@@ -189,7 +206,6 @@ parser.add_argument(
     nargs='?',
     const=True,
     default=None,
-    type=argparse.FileType('w'),
     metavar='FILE',
     help="""
 Dump a log of vim messages received during execution.
@@ -202,7 +218,6 @@ parser.add_argument(
     nargs='?',
     const=True,
     default=None,
-    type=argparse.FileType('w'),
     metavar='FILE',
     help="""
 Dump a list of command sent to vim during execution.
@@ -215,7 +230,6 @@ parser.add_argument(
     nargs='?',
     const=True,
     default=None,
-    type=argparse.FileType('w'),
     metavar='FILE',
     help="""
 Dump vim system call logs to [FILE].
@@ -226,10 +240,13 @@ Logs are written to [FILE], or to the same place as --out if [FILE] is omitted.
 #
 # Strictness configuration
 
+# The strictness values are spelled out literally (and validated in Parse)
+# rather than pulled from vroom.messages/vroom.shell, which keeps those
+# subsystems out of the import graph for --help and argparse errors.
 parser.add_argument(
     '--message-strictness',
-    choices=vroom.messages.STRICTNESS.Values(),
-    default=vroom.messages.STRICTNESS.ERRORS,
+    metavar='{STRICT,RELAXED,GUESS-ERRORS}',
+    default='GUESS-ERRORS',
     help="""
 How to deal with unexpected messages.
 When STRICT, unexpected messages will be treated as errors.
@@ -242,8 +259,8 @@ ERROR.
 
 parser.add_argument(
     '--system-strictness',
-    choices=vroom.shell.STRICTNESS.Values(),
-    default=vroom.shell.STRICTNESS.STRICT,
+    metavar='{STRICT,RELAXED}',
+    default='STRICT',
     help="""
 How to deal with unexpected system calls.
 When STRICT (default), unexpected system calls will be treated as errors.
@@ -292,9 +309,30 @@ def Parse(args):
   """
   args = parser.parse_args(args)
 
-  if args.out != sys.stdout:
+  if args.out == '-':
+    args.out = sys.stdout
+
+  # Deferred so that --help/--version and argparse errors never pay for the
+  # terminal probing vroom.color does.
+  # pylint: disable-msg=g-import-not-at-top
+  import vroom.color
+  if args.color == 'colored' and args.out == sys.stdout:
+    args.color = vroom.color.Colored
+  else:
     args.color = vroom.color.Colorless
 
+  # Deferred like vroom.color above; the parser only knows the strictness
+  # values as literals, so check them against the real specifications here.
+  import vroom.messages
+  import vroom.shell
+  if args.message_strictness not in frozenset(
+      vroom.messages.STRICTNESS.Values()):
+    parser.error('argument --message-strictness: invalid choice: %r'
+                 % args.message_strictness)
+  if args.system_strictness not in frozenset(vroom.shell.STRICTNESS.Values()):
+    parser.error('argument --system-strictness: invalid choice: %r'
+                 % args.system_strictness)
+
   if not hasattr(args, 'delay'):
     # Default delay is 0.09 for Vim, 0 for Neovim
     args.delay = 0 if args.neovim else 0.09
@@ -302,19 +340,60 @@ def Parse(args):
     # Default shell delay is 0.25 for Vim, 0 for Neovim
     args.shell_delay = 0 if args.neovim else 0.25
 
-  for dumper in ('dump_messages', 'dump_commands', 'dump_syscalls'):
-    if getattr(args, dumper) is True:
-      setattr(args, dumper, args.out)
-
-  args.filenames = list(itertools.chain(
-      Crawl(args.crawl, args.skip),
-      *map(Expand, getattr(args, 'filename', []))))
+  # Canonicalize the path arguments once up front, so Crawl/Expand and the
+  # dedup set below work on plain string equality and prefix checks instead of
+  # each re-normalizing per comparison.
+  args.skip = [os.path.normpath(path) for path in args.skip]
+  if args.crawl:
+    args.crawl = os.path.normpath(args.crawl)
+  if getattr(args, 'filename', None):
+    args.filename = [os.path.normpath(filename) for filename in args.filename]
+
+  def EnumerateFilenames():
+    yield from Crawl(args.crawl, args.skip)
+    # One cache for the whole invocation, so repeated or overlapping filename
+    # arguments don't re-stat the same paths.
+    expand_cache = {}
+    for filename in getattr(args, 'filename', []):
+      yield from Expand(filename, expand_cache)
+
+  # Streaming with inline dedup: no intermediate per-argument lists, and a
+  # file reachable both from --crawl and an explicit argument runs once.
+  seen = set()
+  args.filenames = []
+  for filename in EnumerateFilenames():
+    if filename not in seen:
+      seen.add(filename)
+      args.filenames.append(filename)
   if not args.filenames and not args.murder:
     raise ValueError('Nothing to do.')
   if args.murder and args.filenames:
     raise ValueError(
         'You may birth tests and you may end them, but not both at once!')
 
+  def OpenOutput(flag, path):
+    # Failures surface the same way argparse's FileType reported them.
+    try:
+      return open(path, 'w')
+    except OSError as e:
+      parser.error("argument %s: can't open '%s': %s" % (flag, path, e))
+
+  # Only open output files now that the invocation is known to be valid.
+  if isinstance(args.out, str):
+    args.out = OpenOutput('-o/--out', args.out)
+  # Namespace attributes live in its __dict__; going straight there skips
+  # six getattr/setattr descriptor walks.
+  options = args.__dict__
+  for dumper in ('dump_messages', 'dump_commands', 'dump_syscalls'):
+    value = options[dumper]
+    if value is True:
+      options[dumper] = args.out
+    elif isinstance(value, str):
+      if value == '-':
+        options[dumper] = sys.stdout
+      else:
+        options[dumper] = OpenOutput('--' + dumper.replace('_', '-'), value)
+
   return args
 
 
@@ -330,36 +409,69 @@ def Close(args):
   args.out.close()
 
 
-def Expand(filename):
+def Expand(filename, cache=None):
   """Expands a filename argument into a list of relevant filenames.
 
   Args:
     filename: The filename to expand.
+    cache: An optional dict memoizing expansions for repeated filenames.
   Raises:
     ValueError: When filename is non-existent.
   Returns:
     All vroom files in the directory (if it's a directory) and all files
     matching the glob (if it's a glob).
   """
-  if os.path.isdir(filename):
-    return glob.glob(os.path.join(filename, '*.vroom'))
-  files = list(glob.glob(filename))
-  if not files and os.path.exists(filename + '.vroom'):
-    files = [filename + '.vroom']
-  elif not files and not glob.has_magic(filename):
-    raise ValueError('File "%s" not found.' % filename)
+  if cache is not None and filename in cache:
+    return cache[filename]
+  files = _Expand(filename)
+  if cache is not None:
+    cache[filename] = files
   return files
 
 
+def _Expand(filename):
+  if os.path.isdir(filename):
+    # One scandir beats glob's pattern machinery for a fixed suffix.
+    with os.scandir(filename) as entries:
+      return [entry.path for entry in entries
+              if entry.name.endswith('.vroom')
+              and not entry.name.startswith('.')]
+  # Only fall back to glob when the argument actually contains magic.
+  if glob.has_magic(filename):
+    return glob.glob(filename)
+  if os.path.lexists(filename):
+    return [filename]
+  if os.path.exists(filename + '.vroom'):
+    return [filename + '.vroom']
+  raise ValueError('File "%s" not found.' % filename)
+
+
 def IgnoredPaths(directory, skipped):
+  """Builds the ignore prefixes for Crawl.
+
+  The crawler compares these against scandir-built paths with plain prefix
+  matches. Scan builds those paths by joining entry names onto the crawl
+  directory, so only the user-supplied component is normalized before being
+  joined the same way; normalizing the whole join would strip the './' prefix
+  that paths under a relative crawl directory keep.
+
+  >>> list(IgnoredPaths('.', ['skipme', './other/file.vroom']))
+  ['./skipme/', './other/file.vroom']
+
+  Args:
+    directory: The (already normalized) crawl directory.
+    skipped: Paths to ignore, relative to the crawl directory or absolute.
+  Yields:
+    One prefix per skipped path.
+  """
   for path in skipped:
     # --skip paths must be relative to the --crawl directory.
-    path = os.path.join(directory, path)
+    path = os.path.join(directory, os.path.normpath(path))
     # All ignored paths which do not end in '.vroom' are assumed to be
     # directories. We have to make sure they've got a trailing slash, or
     # --skip=foo will axe anything with a foo prefix (foo/, foobar/, etc.)
     if not path.endswith('.vroom'):
-      path = os.path.join(path, '')
+      path += os.sep
     yield path
 
 
@@ -376,17 +488,52 @@ def Crawl(directory, ignored):
   if not directory:
     return
 
-  ignored = list(IgnoredPaths(directory, ignored))
-
-  for (dirpath, dirnames, filenames) in os.walk(directory):
-    # Traverse directories in alphabetical order. Default order fine for fnames.
-    dirnames.sort()
-    for filename in filenames:
-      fullpath = os.path.join(dirpath, filename)
-      for ignore in ignored:
-        shared = os.path.commonprefix([ignore, fullpath])
-        if shared == ignore:
-          break
-      else:
-        if filename.endswith('.vroom'):
-          yield fullpath
+  # Normalized so the paths scandir builds below line up with the normalized
+  # ignore prefixes.
+  directory = os.path.normpath(directory)
+  ignored = tuple(IgnoredPaths(directory, ignored))
+  # Ignored directories carry a trailing separator; whole subtrees under them
+  # can be pruned from the traversal instead of being filtered file by file.
+  ignored_dirs = tuple(path for path in ignored if path.endswith(os.sep))
+
+  # One compiled alternation per path beats a Python-level loop over the
+  # prefixes. re.match anchors at the start, which is exactly a prefix test.
+  ignore_match = (
+      re.compile('|'.join(map(re.escape, ignored))).match if ignored else None)
+  ignore_dir_match = (
+      re.compile('|'.join(map(re.escape, ignored_dirs))).match
+      if ignored_dirs else None)
+
+  def Scan(dirpath):
+    """Yields vroom files below dirpath with one scandir per directory."""
+    subdirs = []
+    try:
+      entries = os.scandir(dirpath)
+    except OSError:
+      # Unreadable directories are skipped, as os.walk did.
+      return
+    with entries:
+      for entry in entries:
+        try:
+          is_dir = entry.is_dir()
+        except OSError:
+          is_dir = False
+        if is_dir:
+          # Like os.walk's default, don't descend into directory symlinks.
+          # Pruned subtrees are dropped here, before the sort below, so they
+          # cost neither a compare nor a recursion.
+          if not entry.is_symlink() and (
+              ignore_dir_match is None or
+              not ignore_dir_match(entry.path + os.sep)):
+            subdirs.append(entry.path)
+        elif entry.name.endswith('.vroom'):
+          fullpath = entry.path
+          # An ignored path matches exactly when it's a prefix of the path.
+          if ignore_match is None or not ignore_match(fullpath):
+            yield fullpath
+    # Traverse directories in alphabetical order. Default order fine for files.
+    subdirs.sort()
+    for subdir in subdirs:
+      yield from Scan(subdir)
+
+  yield from Scan(directory)
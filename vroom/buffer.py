@@ -29,10 +29,14 @@ class Manager(object):
     Otherwise if no buffer is requested, the current buffer is used.
     Otherwise the requested buffer is loaded.
 
+    Command execution unloads the manager, so data loaded here is current for
+    the whole verification block; explicitly naming the already-loaded buffer
+    doesn't need another round trip to vim.
+
     Args:
       buff: The buffer to load.
     """
-    if self._loaded and buff is None:
+    if self._loaded and (buff is None or buff == self._buffer):
       return
     self.Unload()
     self._data = self.vim.GetBufferLines(buff)
@@ -69,13 +73,17 @@ class Manager(object):
     # If there's an error, they'll want to know what we were looking at.
     self._last_range = (start, end)
 
-    # Yield each relevant line in the range.
-    for i in range(start, end):
+    # Yield each relevant line in the range. The bounds check happens once up
+    # front instead of per line; _line still tracks each yielded line so that
+    # failures raised by the consumer report the right context.
+    data = self._data
+    data_len = len(data)
+    for i in range(start, min(end, data_len)):
       self._line = i
-      if i < len(self._data):
-        yield self._data[i]
-      else:
-        raise NotEnoughOutput(self.GetContext())
+      yield data[i]
+    if end > data_len:
+      self._line = max(start, data_len)
+      raise NotEnoughOutput(self.GetContext())
 
   # 'range' is the most descriptive name here. Putting 'range' in kwargs and
   # pulling it out obfuscates the code. Sorry, pylint. (Same goes for 'buffer'.)
@@ -96,8 +104,10 @@ class Manager(object):
     """
     self.Load(buffer)
     start, end = range or (None, None)
+    # One compiled matcher for the whole range.
+    matches = vroom.test.Matcher(desired, mode)
     for actual in self.View(start, end):
-      if not vroom.test.Matches(desired, mode, actual):
+      if not matches(actual):
         raise WrongOutput(desired, mode, self.GetContext())
 
   # See self.Verify for the reasoning behind the pylint trump.
@@ -1,35 +1,59 @@
 """Vroom terminal coloring."""
-import subprocess
-
-# Grab the colors from the system.
 try:
-  BOLD = subprocess.check_output(['tput', 'bold']).decode('utf-8')
-  RED = subprocess.check_output(['tput', 'setaf', '1']).decode('utf-8')
-  GREEN = subprocess.check_output(['tput', 'setaf', '2']).decode('utf-8')
-  YELLOW = subprocess.check_output(['tput', 'setaf', '3']).decode('utf-8')
-  BLUE = subprocess.check_output(['tput', 'setaf', '4']).decode('utf-8')
-  VIOLET = subprocess.check_output(['tput', 'setaf', '5']).decode('utf-8')
-  TEAL = subprocess.check_output(['tput', 'setaf', '6']).decode('utf-8')
-  WHITE = subprocess.check_output(['tput', 'setaf', '7']).decode('utf-8')
-  BLACK = subprocess.check_output(['tput', 'setaf', '8']).decode('utf-8')
-  RESET = subprocess.check_output(['tput', 'sgr0']).decode('utf-8')
-except subprocess.CalledProcessError:
-  COLORED = False
-  # Placeholders for code that tries to map things onto terminal colors.
-  # These will be unused anyway if COLORED=False, and empty string would be
-  # "no-op" color code for any code that did end up using these values.
-  BOLD = ''
-  RED = ''
-  GREEN = ''
-  YELLOW = ''
-  BLUE = ''
-  VIOLET = ''
-  TEAL = ''
-  WHITE = ''
-  BLACK = ''
-  RESET = ''
-else:
-  COLORED = True
+  import curses
+except ImportError:
+  curses = None
+
+# The setaf color escapes, in terminfo argument order starting at 1.
+_SETAF_NAMES = (
+    'RED', 'GREEN', 'YELLOW', 'BLUE', 'VIOLET', 'TEAL', 'WHITE', 'BLACK')
+_ESCAPE_NAMES = ('BOLD',) + _SETAF_NAMES + ('RESET',)
+# setupterm raises curses.error on dumb/absent terminals; incomplete terminfo
+# entries surface as LookupError below.
+_INIT_ERRORS = (LookupError,) + ((curses.error,) if curses else ())
+
+
+def _InitColors():
+  """Grabs the colors from the terminfo database, once, on first use.
+
+  Deferred until something actually asks for a color instead of being paid on
+  import (where it would hit even --help and --nocolor runs). curses reads the
+  terminfo database in-process, so this costs one setupterm rather than a
+  subprocess per escape.
+  """
+  if 'COLORED' in globals():
+    return
+  escapes = {}
+  try:
+    if curses is None:
+      raise LookupError('curses unavailable')
+    curses.setupterm()
+    bold = curses.tigetstr('bold')
+    setaf = curses.tigetstr('setaf')
+    reset = curses.tigetstr('sgr0')
+    if bold is None or setaf is None or reset is None:
+      raise LookupError('terminal does not support color')
+    escapes['BOLD'] = bold.decode('ascii')
+    for num, name in enumerate(_SETAF_NAMES, start=1):
+      escapes[name] = curses.tparm(setaf, num).decode('ascii')
+    escapes['RESET'] = reset.decode('ascii')
+  except _INIT_ERRORS:
+    # Placeholders for code that tries to map things onto terminal colors.
+    # These will be unused anyway if COLORED=False, and empty string would be
+    # "no-op" color code for any code that did end up using these values.
+    escapes = {name: '' for name in _ESCAPE_NAMES}
+    escapes['COLORED'] = False
+  else:
+    escapes['COLORED'] = True
+  globals().update(escapes)
+
+
+def __getattr__(name):
+  # Lazy module attributes (PEP 562) so vroom.color.RED et al. still work.
+  if name == 'COLORED' or name in _ESCAPE_NAMES:
+    _InitColors()
+    return globals()[name]
+  raise AttributeError('module %r has no attribute %r' % (__name__, name))
 
 
 # We keep the unused argument for symmetry with Colored
@@ -54,6 +78,7 @@ def Colored(text, *escapes):
   Returns:
     text surrounded by the right escapes.
   """
+  _InitColors()
   if not COLORED:
     return text
   return '%s%s%s' % (''.join(escapes), text, RESET)
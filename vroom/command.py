@@ -32,11 +32,15 @@ class Command(object):
     self._mexpectations.append((message, mode))
 
   def ExpectSyscall(self, syscall, mode):
+    # Deferred so files without system expectations never import the fake
+    # shell machinery; sys.modules makes repeat calls free.
+    import vroom.shell
     if self._syspectations:
       self._syspectations[-1].closed = True
     self._syspectations.append(vroom.shell.Hijack(self.fakecmd, syscall, mode))
 
   def RespondToSyscall(self, response, **controls):
+    import vroom.shell
     if not self._syspectations or self._syspectations[-1].closed:
       self._syspectations.append(vroom.shell.Hijack(self.fakecmd))
     self._syspectations[-1].Respond(response, **controls)
@@ -47,33 +51,30 @@ class Command(object):
 
   def Execute(self):
     """Executes the command and verifies all checks."""
-    if not any((self.command, self._mexpectations, self._syspectations)):
+    if not self.command and not self._mexpectations and not self._syspectations:
       return Result.Success()
 
-    self.env.shell.Control(self._syspectations)
-    oldmessages = self.env.vim.GetMessages()
+    env = self.env
+    env.shell.Control(self._syspectations)
+    oldmessages = env.vim.GetMessages()
     if self.lineno:
-      self.env.writer.actions.ExecutedUpTo(self.lineno)
+      env.writer.actions.ExecutedUpTo(self.lineno)
     if self.command:
       delay = self.delay
       if self._syspectations:
-        delay += self.env.args.shell_delay
-      self.env.vim.Communicate(self.command, delay)
+        delay += env.args.shell_delay
+      env.vim.Communicate(self.command, delay)
 
-    failures = []
     # Verify the message list.
-    newmessages = self.env.vim.GetMessages()
-    result = self.env.messenger.Verify(
+    newmessages = env.vim.GetMessages()
+    messages = env.messenger.Verify(
         oldmessages, newmessages, self._mexpectations)
-    if result.IsError():
-      failures.append(result.value)
-
     # Verify the shell.
-    result = self.env.shell.Verify()
-    if result.IsError():
-      failures.append(result.value)
+    shell = env.shell.Verify()
 
-    if failures:
+    # No allocations on the common all-clear path.
+    if messages.IsError() or shell.IsError():
+      failures = [result.value
+                  for result in (messages, shell) if result.IsError()]
       return Result.Error(vroom.test.Failures(failures))
-    else:
-      return Result.Success()
+    return Result.Success()
@@ -1,4 +1,5 @@
 """Vroom control block parsing."""
+import functools
 import re
 
 import vroom
@@ -24,16 +25,55 @@ MODE = vroom.Specification(
 SPECIAL_RANGE = vroom.Specification(
     CURRENT_LINE='.')
 
+# Control strings are ASCII-only, so re.ASCII swaps the Unicode-aware \w/\d
+# classes for plain byte-class tests. The MODE alternation is ordered by
+# observed frequency so the common words shortcut it.
 REGEX = vroom.Specification(
-    BUFFER_NUMBER=re.compile(r'^(\d+)$'),
-    RANGE=re.compile(r'^(\.|\d+)?(?:,(\+)?(\$|\d+)?)?$'),
-    MODE=re.compile(r'^(%s)$' % '|'.join(MODE.Values())),
-    DELAY=re.compile(r'^(\d+(?:\.\d+)?)s?$'),
-    CONTROL_BLOCK=re.compile(r'(  .*) \(\s*([%><=\'"\w\d.+,$ ]*)\s*\)$'),
-    ESCAPED_BLOCK=re.compile(r'(  .*) \(&([^)]+)\)$'))
+    # MODE is a pure accept/reject test, so it carries no capture group for
+    # the engine to record.
+    RANGE=re.compile(r'^(\.|\d+)?(?:,(\+)?(\$|\d+)?)?$', re.ASCII),
+    MODE=re.compile(r'^(?:verbatim|regex|glob)\Z', re.ASCII),
+    DELAY=re.compile(r'^(\d+(?:\.\d+)?)s?$', re.ASCII),
+    CONTROL_BLOCK=re.compile(r'(  .*) \(\s*([%><=\'"\w.+,$ ]*)\s*\)$',
+                             re.ASCII),
+    ESCAPED_BLOCK=re.compile(r'(  .*) \(&([^)]+)\)$', re.ASCII))
 
 DEFAULT_MODE = MODE.VERBATIM
 
+# Bound methods for SplitLine, hoisted past the Specification attribute
+# lookups it would otherwise repeat on every line.
+_CONTROL_BLOCK_MATCH = REGEX.CONTROL_BLOCK.match
+_ESCAPED_BLOCK_MATCH = REGEX.ESCAPED_BLOCK.match
+
+
+# The word classes below are small closed sets of literal strings, so a
+# frozenset probe beats entering the regex engine per word. (REGEX.MODE stays
+# around for anything matching against it directly.)
+_MODE_SET = frozenset(MODE.Values())
+
+
+# The sets below depend on specifications from vroom.messages and vroom.shell.
+# vroom.controls can't import those at module level, because that creates a
+# circular dependency both with itself (controls is imported for DEFAULT_MODE)
+# and vroom.test. The specifications never change after import, so build each
+# set on first use and keep the result.
+@functools.lru_cache(maxsize=None)
+def _MessageStrictnessSet():
+  import vroom.messages  # pylint: disable-msg=g-import-not-at-top
+  return frozenset(vroom.messages.STRICTNESS.Values())
+
+
+@functools.lru_cache(maxsize=None)
+def _SystemStrictnessSet():
+  import vroom.shell  # pylint: disable-msg=g-import-not-at-top
+  return frozenset(vroom.shell.STRICTNESS.Values())
+
+
+@functools.lru_cache(maxsize=None)
+def _OutputChannelSet():
+  import vroom.shell  # pylint: disable-msg=g-import-not-at-top
+  return frozenset(vroom.shell.OUTCHANNEL.Values())
+
 
 def SplitLine(line):
   """Splits the line controls off of a line.
@@ -52,10 +92,14 @@ def SplitLine(line):
   Returns:
     (line, control string)
   """
-  match = REGEX.CONTROL_BLOCK.match(line)
+  # Both block regexes are anchored on a ')$'; most lines have no control
+  # suffix at all, and this check keeps them out of the regex engine.
+  if not line.endswith(')'):
+    return (line, None)
+  match = _CONTROL_BLOCK_MATCH(line)
   if match:
     return match.groups()
-  unescape = REGEX.ESCAPED_BLOCK.match(line)
+  unescape = _ESCAPED_BLOCK_MATCH(line)
   if unescape:
     return ('%s (%s)' % unescape.groups(), None)
   return (line, None)
@@ -78,11 +122,27 @@ def BufferWord(word):
   Raises:
     UnrecognizedWord: When the word is not a buffer word.
   """
-  if REGEX.BUFFER_NUMBER.match(word):
+  # Equivalent to the old ^\d+ regex (ASCII digits only), without the regex.
+  if word.isascii() and word.isdigit():
     return int(word)
   raise UnrecognizedWord(word)
 
 
+# RangeWord end-resolvers, hoisted so each parse hands out a shared callable
+# instead of allocating a fresh closure, and so the numeric forms parse
+# int(end) once instead of every time the resolver runs.
+_SAME_AS_START = lambda start: start
+_END_OF_BUFFER = lambda _start: 0
+
+
+def _OffsetFrom(offset, start):
+  return start + offset
+
+
+def _ConstantEnd(end, _start):
+  return end
+
+
 def RangeWord(word):
   """Parses a range control word.
 
@@ -128,13 +188,13 @@ def RangeWord(word):
   elif start:
     start = int(start)
   if end is None and operator is None:
-    getend = lambda x: x
+    getend = _SAME_AS_START
   elif end == '$':
-    getend = lambda x: 0
+    getend = _END_OF_BUFFER
   elif operator == '+':
-    getend = lambda x: x + int(end)
+    getend = functools.partial(_OffsetFrom, int(end))
   else:
-    getend = lambda x: int(end)
+    getend = functools.partial(_ConstantEnd, int(end))
   return (start, getend)
 
 
@@ -184,8 +244,7 @@ def ModeWord(word):
   Raises:
     UnrecognizedWord: When the word is not a mode word.
   """
-  match = REGEX.MODE.match(word)
-  if match:
+  if word in _MODE_SET:
     return word
   raise UnrecognizedWord(word)
 
@@ -212,15 +271,7 @@ def MessageWord(word):
   Raises:
     UnrecognizedWord: When the word is not a STRICTNESS.
   """
-  # vroom.controls can't import vroom.messages, because that creates a circular
-  # dependency both with itself (controls is imported for DEFAULT_MODE) and
-  # vroom.test. Sorry, pylint
-  # Pylint, brilliant as usual, thinks that this line redefines 'vroom'.
-  # pylint: disable-msg=redefined-outer-name
-  import vroom.messages  # pylint: disable-msg=g-import-not-at-top
-  regex = re.compile(r'^(%s)$' % '|'.join(vroom.messages.STRICTNESS.Values()))
-  match = regex.match(word)
-  if match:
+  if word in _MessageStrictnessSet():
     return word
   raise UnrecognizedWord(word)
 
@@ -245,15 +296,7 @@ def SystemWord(word):
   Raises:
     UnrecognizedWord: When the word is not a STRICTNESS.
   """
-  # vroom.controls can't import vroom.shell, because that creates a circular
-  # dependency both with itself (controls is imported for DEFAULT_MODE) and
-  # vroom.test. Sorry, pylint.
-  # Pylint, brilliant as usual, thinks that this line redefines 'vroom'.
-  # pylint: disable-msg=redefined-outer-name
-  import vroom.shell  # pylint: disable-msg=g-import-not-at-top
-  regex = re.compile(r'^(%s)$' % '|'.join(vroom.shell.STRICTNESS.Values()))
-  match = regex.match(word)
-  if match:
+  if word in _SystemStrictnessSet():
     return word
   raise UnrecognizedWord(word)
 
@@ -282,15 +325,7 @@ def OutputChannelWord(word):
   Raises:
     UnrecognizedWord: When the word is not an OUTCHANNEL.
   """
-  # vroom.controls can't import vroom.shell, because that creates a circular
-  # dependency both with itself (controls is imported for DEFAULT_MODE) and
-  # vroom.test. Sorry, pylint
-  # Pylint, brilliant as usual, thinks that this line redefines 'vroom'.
-  # pylint: disable-msg=redefined-outer-name
-  import vroom.shell  # pylint: disable-msg=g-import-not-at-top
-  regex = re.compile(r'^(%s)$' % '|'.join(vroom.shell.OUTCHANNEL.Values()))
-  match = regex.match(word)
-  if match:
+  if word in _OutputChannelSet():
     return word
   raise UnrecognizedWord(word)
 
@@ -306,6 +341,36 @@ OPTION_PARSERS = {
 }
 
 
+_DEFAULT_OPTIONS = (OPTION.BUFFER, OPTION.RANGE, OPTION.MODE, OPTION.DELAY)
+# Parse skeletons keyed on the options tuple: the (option, parser) pairs and a
+# canonical all-None result to copy from. The same few option signatures recur
+# for every control block, so this saves rebuilding both per call.
+_PARSE_CACHE = {}
+
+
+@functools.lru_cache(maxsize=1024)
+def _Classify(word):
+  """Cheap candidate OPTIONs for a control word.
+
+  Lets Parse skip parsers that can't possibly match instead of discovering
+  that through a raised ParseError: words led by digits or range punctuation
+  can only be buffer/range/delay controls, and letter words can only be modes,
+  strictnesses, or output channels. The classification is a superset of what
+  actually parses; Parse still runs the real parser. Cached because control
+  tokens repeat heavily ('2', 'regex', 'STRICT', ...).
+
+  Args:
+    word: The control word.
+  Returns:
+    A tuple of OPTION values worth trying.
+  """
+  head = word[:1]
+  if head.isdigit() or head in '.,+$':
+    return (OPTION.BUFFER, OPTION.RANGE, OPTION.DELAY)
+  return (OPTION.MODE, OPTION.MESSAGE_STRICTNESS, OPTION.SYSTEM_STRICTNESS,
+          OPTION.OUTPUT_CHANNEL)
+
+
 def Parse(controls, *options):
   """Parses a control block.
 
@@ -351,13 +416,17 @@ def Parse(controls, *options):
   Raises:
     ValueError: When the control can not be parsed.
   """
-  if not options:
-    options = [OPTION.BUFFER, OPTION.RANGE, OPTION.MODE, OPTION.DELAY]
-  for option in [o for o in options if o not in OPTION_PARSERS]:
-    raise ValueError("Can't parse unknown control word: %s" % option)
-  parsers = [(o, OPTION_PARSERS.get(o)) for o in options]
-
-  result = {o: None for o, _ in parsers}
+  key = options or _DEFAULT_OPTIONS
+  cached = _PARSE_CACHE.get(key)
+  if cached is None:
+    for option in [o for o in key if o not in OPTION_PARSERS]:
+      raise ValueError("Can't parse unknown control word: %s" % option)
+    cached = _PARSE_CACHE[key] = (
+        tuple((o, OPTION_PARSERS[o]) for o in key),
+        {o: None for o in key})
+  parsers, empty = cached
+
+  result = empty.copy()
 
   def Insert(key, val, word):
     if result[key] is not None:
@@ -366,7 +435,10 @@ def Parse(controls, *options):
 
   error = None
   for word in controls.split():
+    candidates = _Classify(word)
     for option, parser in parsers:
+      if option not in candidates:
+        continue
       try:
         Insert(option, parser(word), word)
       except vroom.ParseError as e:
@@ -374,7 +446,18 @@ def Parse(controls, *options):
       else:
         break
     else:
-      raise error
+      # No applicable parser succeeded. Rerun the unfiltered scan so words
+      # that fall outside every candidate class fail (with the same error) or
+      # parse exactly as they did before the prefilter existed.
+      for option, parser in parsers:
+        try:
+          Insert(option, parser(word), word)
+        except vroom.ParseError as e:
+          error = e
+        else:
+          break
+      else:
+        raise error
 
   return result
 
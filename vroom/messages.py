@@ -21,6 +21,9 @@ STRICTNESS = vroom.Specification(
     ERRORS='GUESS-ERRORS')
 DEFAULT_MODE = vroom.controls.MODE.VERBATIM
 
+# Separator for GuessNewMessages that can't equal any real message.
+_SENTINEL = object()
+
 
 def GuessNewMessages(old, new):
   """Guess which messages in a message list are new.
@@ -45,10 +48,24 @@ def GuessNewMessages(old, new):
   # Technically, it's always possible to miss exactly [MESSAGE_MAX] messages
   # if you echo them out in a perfect cycle in one command. So it goes.
   # Message lists are straight from vim, so oldest is first.
-  for i in range(len(old)):
-    if old[i:] == new[:len(old) - i]:
-      return new[len(old) - i:]
-  return new[:]
+  #
+  # We want the longest suffix of old that is a prefix of new. Comparing
+  # slices at every offset is quadratic in the message count; the KMP prefix
+  # function over new + sentinel + old finds the same overlap in one linear
+  # pass with no slice allocations (the sentinel never matches, capping the
+  # overlap at len(new)).
+  if not old or not new:
+    return new[:]
+  combined = new + [_SENTINEL] + old
+  overlaps = [0] * len(combined)
+  k = 0
+  for i in range(1, len(combined)):
+    while k and combined[i] != combined[k]:
+      k = overlaps[k - 1]
+    if combined[i] == combined[k]:
+      k += 1
+    overlaps[i] = k
+  return new[overlaps[-1]:]
 
 
 def StartsWithBuiltinMessages(messages):
@@ -95,36 +112,44 @@ class Messenger(object):
       new = StripBuiltinMessages(new)
     unread = GuessNewMessages(old, new)
     failures = []
+    # One command-log snapshot for every failure raised below; Logs() copies
+    # the queue and nothing here writes to it.
+    logs = self.vim.writer.Logs()
     for message in unread:
       self.writer.Log(vroom.test.Received(message))
+    # An index cursor into unread; pop(0) shifts the whole list per message.
+    cursor = 0
+    end = len(unread)
     for (desired, mode) in expectations:
       mode = mode or DEFAULT_MODE
+      # One cached compiled matcher per expectation, reused as the inner loop
+      # scans past unexpected messages.
+      matches = vroom.test.Matcher(desired, mode)
       while True:
-        try:
-          message = unread.pop(0)
-        except IndexError:
+        if cursor >= end:
           expectation = '"%s" (%s mode)' % (desired, mode)
-          failures.append(
-              MessageNotReceived(expectation, new, self.vim.writer.Logs()))
+          failures.append(MessageNotReceived(expectation, new, logs))
           break
-        if vroom.test.Matches(desired, mode, message):
+        message = unread[cursor]
+        cursor += 1
+        if matches(message):
           self.writer.Log(vroom.test.Matched(desired, mode))
           break
         # Consume unexpected blank if it's the last message. Vim adds spurious
         # blank lines after leaving insert mode.
         # This is done after checking for expected blank messages.
-        if message == '' and not unread:
+        if message == '' and cursor >= end:
           break
         try:
-          self.Unexpected(message, new)
+          self.Unexpected(message, new, logs)
         except MessageFailure as e:
           failures.append(e)
     # Consume unexpected blank if it's the last message.
-    if unread and unread[-1] == '':
-      unread.pop(-1)
-    for remaining in unread:
+    if end > cursor and unread[end - 1] == '':
+      end -= 1
+    for remaining in unread[cursor:end]:
       try:
-        self.Unexpected(remaining, new)
+        self.Unexpected(remaining, new, logs)
       except MessageFailure as e:
         failures.append(e)
 
@@ -133,16 +158,19 @@ class Messenger(object):
     else:
       return Result.Success()
 
-  def Unexpected(self, message, new):
+  def Unexpected(self, message, new, logs=None):
     """Handles an unexpected message."""
     self.writer.Log(vroom.test.Unexpected())
+    if logs is None:
+      logs = self.vim.writer.Logs()
     if self.env.message_strictness == STRICTNESS.STRICT:
-      raise UnexpectedMessage(message, new, self.vim.writer.Logs())
+      raise UnexpectedMessage(message, new, logs)
     elif self.env.message_strictness == STRICTNESS.ERRORS:
-      if ERROR_GUESS.match(message):
-        raise SuspectedError(message, new, self.vim.writer.Logs())
-    raise UnexpectedMessage(
-        message, new, self.vim.writer.Logs(), is_significant=False)
+      # Every ERROR_GUESS alternative starts with 'E'; skip the regex engine
+      # for the overwhelming majority of messages that don't.
+      if message[:1] == 'E' and ERROR_GUESS.match(message):
+        raise SuspectedError(message, new, logs)
+    raise UnexpectedMessage(message, new, logs, is_significant=False)
 
 
 class MessageFailure(vroom.test.Failure):
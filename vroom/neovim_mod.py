@@ -1,5 +1,8 @@
+from io import StringIO
+
 from vroom.vim import CONFIGFILE
 from vroom.vim import Communicator as VimCommunicator
+from vroom.vim import VimscriptString
 import subprocess
 import tempfile
 import time
@@ -9,7 +12,7 @@ import os
 class Communicator(VimCommunicator):
   """Object to communicate with a Neovim server."""
 
-  _listen_addr = None
+  nvim = None
 
   def __init__(self, args, env, writer):
     self.writer = writer.commands
@@ -21,31 +24,53 @@ class Communicator(VimCommunicator):
         '-c', 'source %s' % CONFIGFILE]
     self.env = env
     self._cache = {}
+    self._termcodes_cache = {}
 
   def Quit(self):
-    if not hasattr(self, 'nvim'):
+    if self.nvim is None:
       # Never started
       return
 
     self.nvim.quit()
 
   def Start(self):
-    """Starts Neovim"""
-    if self._listen_addr is not None:
+    """Starts Neovim, embedded over a stdio msgpack-rpc channel.
+
+    attach('child') spawns nvim itself and talks to it over a pipe pair
+    created atomically with the process -- no socket file to create, poll
+    for, or clean up. The child inherits this process's environment, so the
+    test environment is swapped in around the spawn.
+
+    Interactive runs are the exception: an --embed child has no terminal UI,
+    which would make inspecting a failed test impossible. Those spawn a real
+    nvim attached to the terminal and talk to it over a listen socket, with
+    self.process kept around (like the vim communicator's) for the runner to
+    wait on.
+    """
+    if self.nvim is not None:
       raise InvocationError('Called Start on already-running neovim instance')
-    tmpdir = tempfile.mkdtemp()
-    self._listen_addr = os.path.join(tmpdir, 'nvim.pipe')
-    # Legacy env var, used by nvim <0.8
-    self.env['NVIM_LISTEN_ADDRESS'] = self._listen_addr
-    self.start_command += ['--listen', self._listen_addr]
-
-    self.process = subprocess.Popen(self.start_command, env=self.env)
-    start_time = time.time()
-    # Wait at most 5s for the Neovim socket
-    while not os.path.exists(self._listen_addr) \
-            and time.time() - start_time < 5:
-      time.sleep(0.01)
-    self.nvim = neovim.attach('socket', path=self._listen_addr)
+    if self.args.interactive:
+      socket_path = os.path.join(tempfile.mkdtemp(), 'nvim.sock')
+      self.process = subprocess.Popen(
+          self.start_command + ['--listen', socket_path], env=self.env)
+      deadline = time.time() + max(self.args.startuptime, 5)
+      while not os.path.exists(socket_path):
+        if self.process.poll() is not None:
+          raise InvocationError('Neovim quit before its socket came up')
+        if time.time() > deadline:
+          raise InvocationError('Timed out waiting for the neovim socket')
+        time.sleep(0.01)
+      self.nvim = neovim.attach('socket', path=socket_path)
+      return
+    argv = self.start_command + ['--embed']
+    old_environ = os.environ.copy()
+    os.environ.clear()
+    os.environ.update(self.env)
+    try:
+      self.nvim = neovim.attach('child', argv=argv)
+    finally:
+      os.environ.clear()
+      os.environ.update(old_environ)
 
   def Communicate(self, command, extra_delay=0):
     """Sends a command to Neovim.
@@ -57,10 +82,26 @@ class Communicator(VimCommunicator):
       extra_delay: Delay in excess of --delay
     """
     self.writer.Log(command)
-    parsed_command = self.nvim.replace_termcodes(command, True, True, True)
+    # Commands repeat across a test file; translating termcodes is an RPC, so
+    # remember the answer per command string.
+    parsed_command = self._termcodes_cache.get(command)
+    if parsed_command is None:
+      parsed_command = self.nvim.replace_termcodes(command, True, True, True)
+      self._termcodes_cache[command] = parsed_command
     self.nvim.feedkeys(parsed_command)
     self._cache = {}
-    time.sleep(self.args.delay + extra_delay)
+    if extra_delay:
+      # Extra delay was requested explicitly by the test (e.g. to wait out
+      # timers or jobs); honor it as wall time.
+      time.sleep(extra_delay)
+    if self.args.delay:
+      # Rather than sleeping the full delay unconditionally, poll nvim's mode
+      # and return as soon as it's done chewing on the fed keys. The get_mode
+      # request itself forces the input queue to be processed, so the common
+      # case costs one round-trip instead of the whole delay.
+      deadline = time.time() + self.args.delay
+      while self.nvim.api.get_mode()['blocking'] and time.time() < deadline:
+        time.sleep(0.001)
 
   def Ask(self, expression):
     """Asks vim for the result of an expression.
@@ -74,6 +115,23 @@ class Communicator(VimCommunicator):
     """
     return self.nvim.eval(expression)
 
+  def AskMany(self, expressions):
+    """Asks vim for the results of several expressions in one round-trip.
+
+    Args:
+      expressions: A list of expressions to evaluate.
+    Returns:
+      A list with one return value per expression.
+    Raises:
+      InvocationError: If any expression fails to evaluate.
+    """
+    results, error = self.nvim.api.call_atomic(
+        [['nvim_eval', [expression]] for expression in expressions])
+    if error is not None:
+      raise InvocationError(
+          'Error evaluating %r: %r' % (expressions, error))
+    return results
+
   def GetBufferLines(self, number):
     """Gets the lines in the requested buffer.
 
@@ -86,14 +144,20 @@ class Communicator(VimCommunicator):
     """
     if number not in self._cache:
       if number is None:
-        buf = self.nvim.current.buffer
+        # The cursor position is nearly always wanted right after the current
+        # buffer's contents, so fetch both in one atomic round-trip. This may
+        # populate the 'line' cache key alongside the None (current buffer)
+        # key.
+        if 'line' not in self._cache:
+          lines, lineno = self.AskMany(["getline(1, '$')", "line('.')"])
+          self._cache['line'] = int(lineno)
+          self._cache[number] = lines
+          return lines
+        self._cache[number] = list(self.nvim.current.buffer)
       else:
-        for b in self.nvim.buffers:
-          if b.number == number:
-            buf = b
-            break
-
-      self._cache[number] = list(buf)
+        # Resolve the buffer server-side: one getbufline round-trip instead
+        # of walking nvim.buffers for a matching handle.
+        self._cache[number] = self.Ask("getbufline(%d, 1, '$')" % number)
     return self._cache[number]
 
   def GetCurrentLine(self):
@@ -107,16 +171,27 @@ class Communicator(VimCommunicator):
       self._cache['line'] = int(lineno)
     return self._cache['line']
 
+  def Output(self, writer):
+    """Send the writer output to the user."""
+    if self.nvim is not None:
+      buf = StringIO()
+      writer.Write(buf)
+      self.Ask('VroomDie({})'.format(VimscriptString(buf.getvalue())))
+      buf.close()
+
   def Kill(self):
-    """Kills the Neovim process and removes the socket"""
+    """Closes the channel, taking the embedded Neovim down with it."""
     VimCommunicator.Kill(self)
 
-    if os.path.exists(self._listen_addr):
-      os.remove(self._listen_addr)
+    if self.nvim is not None:
+      try:
+        self.nvim.close()
+      except (IOError, OSError):
+        pass
+      self.nvim = None
 
 
 class InvocationError(Exception):
   """Raised when there's a problem starting or interacting with neovim instance.
   """
   is_fatal = True
-
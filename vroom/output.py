@@ -33,6 +33,8 @@ COLORS = {
 class Writer(object):
   """An output writer for a single vroom test file."""
 
+  _stats = None
+
   def __init__(self, filename, args):
     """Creatse the writer.
 
@@ -92,11 +94,8 @@ class Writer(object):
     Returns:
       A dict containing STATUS fields.
     """
-    if not hasattr(self, '_stats'):
-      stats = self.actions.Results()
-      stats['total'] = (
-          stats[STATUS.PASS] + stats[STATUS.ERROR] + stats[STATUS.FAIL])
-      self._stats = stats
+    if self._stats is None:
+      self._stats = self.actions.Results()
     return self._stats
 
   def Status(self):
@@ -173,12 +172,32 @@ class Logger(object):
       file: Alternate file handle to use.
     """
     handle = file or self._file
-    if (verbose is None) or (verbose == self._verbose):
-      if handle == sys.stdout and color is not None:
-        if not isinstance(color, tuple):
-          color = (color,)
-        message = self._color(message, *color)
-      handle.write(message + end)
+    rendered = self._Render(
+        message, verbose, color, end, use_color=handle is sys.stdout)
+    if rendered is not None:
+      handle.write(rendered)
+
+  def _Render(self, message, verbose=None, color=None, end='\n',
+              use_color=False):
+    """Formats a message by Print's rules without writing it.
+
+    Args:
+      message: The message to format.
+      verbose: As in Print.
+      color: As in Print.
+      end: As in Print.
+      use_color: Whether color should be applied at all.
+    Returns:
+      The string to write, or None if the verbosity filter drops the message.
+    """
+    if (verbose is not None) and (verbose != self._verbose):
+      return None
+    # Most lines are colorless, so test that before the handle identity.
+    if color is not None and use_color:
+      if not isinstance(color, tuple):
+        color = (color,)
+      message = self._color(message, *color)
+    return message + end
 
   def Write(self, filename, file=None):
     """Writes all messages.
@@ -261,10 +280,21 @@ class ActionLogger(Logger):
       lines: The file's lines.
     """
     self._lines = lines
+    # The line count is fixed for the life of the file, so compute the
+    # zero-padding width once instead of per Lineno call.
+    self._lineno_width = len(str(len(lines)))
+    if self._verbose:
+      # Verbose mode ultimately prints every numbered line exactly once, so
+      # render them all now; ExecutedUpTo just slices this list.
+      width = self._lineno_width
+      self._prerendered = [
+          '%s %s' % (str(i + 1).zfill(width), line.rstrip('\n'))
+          for i, line in enumerate(lines)]
     self._nextline = 0
     self._passed = 0
     self._errored = 0
     self._failed = 0
+    self._total = 0
     self._opened = True
 
   def Write(self, filename, file=None):
@@ -280,8 +310,17 @@ class ActionLogger(Logger):
     if not self._opened:
       raise NoTestRunning
     self.ExecutedUpTo(len(self._lines) - 1)
+    # Render everything first and flush it in one write, rather than one
+    # write call (and potential stdout flush) per queued entry.
+    handle = file or self._file
+    use_color = handle is sys.stdout
+    out = []
     for (line, args, kwargs) in self._queue:
-      self.Print(line, *args, file=file, **kwargs)
+      rendered = self._Render(line, *args, use_color=use_color, **kwargs)
+      if rendered is not None:
+        out.append(rendered)
+    if out:
+      handle.write(''.join(out))
 
   def PutStat(self, stats, stat, fmt, **kwargs):
     """Writes a stat to output.
@@ -309,6 +348,10 @@ class ActionLogger(Logger):
       *args: Will be passed to Print.
       **kwargs: Will be passed to Print.
     """
+    # Normalize the color to a tuple now so Print doesn't have to per line.
+    color = kwargs.get('color')
+    if color is not None and not isinstance(color, tuple):
+      kwargs['color'] = (color,)
     self._queue.append((message, args, kwargs))
 
   def Log(self, result, lineno, error=None):
@@ -334,10 +377,13 @@ class ActionLogger(Logger):
     """
     if result == vroom.test.RESULT.PASSED:
       self._passed += 1
-    if result == vroom.test.RESULT.ERROR:
+    elif result == vroom.test.RESULT.ERROR:
       self._errored += 1
-    if result == vroom.test.RESULT.FAILED:
+    elif result == vroom.test.RESULT.FAILED:
       self._failed += 1
+    else:
+      return
+    self._total += 1
 
   def ExecutedUpTo(self, lineno):
     """Print output put to a given line number.
@@ -349,9 +395,11 @@ class ActionLogger(Logger):
       lineno: The line to print up to.
     """
     if self._verbose:
-      for i, line in enumerate(self._lines[self._nextline:lineno + 1]):
-        number = self.Lineno(self._nextline + i)
-        self.Queue('%s %s' % (number, line.rstrip('\n')))
+      # One pre-joined queue entry (and later one write) for the whole block,
+      # instead of an entry per line.
+      block = self._prerendered[self._nextline:lineno + 1]
+      if block:
+        self.Queue('\n'.join(block))
     self._nextline = lineno + 1
 
   def Lineno(self, lineno):
@@ -362,8 +410,8 @@ class ActionLogger(Logger):
     Returns:
       The zero-padded string.
     """
-    numberifier = '%%0%dd' % len(str(len(self._lines)))
-    return numberifier % (lineno + 1)
+    # zfill is a C fast path; %-formatting re-parses the format per call.
+    return str(lineno + 1).zfill(self._lineno_width)
 
   def Error(self, result, error):
     """Logs an error that didn't occur at a specific line.
@@ -401,15 +449,18 @@ class ActionLogger(Logger):
     # Also, python can't do real closures, which is why contexted is a list.
     contexted = [False]
 
+    # Flatten the failure list once up front; it used to be re-walked for
+    # every context attribute below.
+    sources = [error]
+    if hasattr(error, 'GetFlattenedFailures'):
+      sources.extend(error.GetFlattenedFailures())
+
     def QueueContext(attr, writer, *args):
       value = None
-      if hasattr(error, attr):
-        value = getattr(error, attr)
-      elif hasattr(error, 'GetFlattenedFailures'):
-        for f in error.GetFlattenedFailures():
-          if hasattr(f, attr):
-            value = getattr(f, attr)
-            break
+      for source in sources:
+        if hasattr(source, attr):
+          value = getattr(source, attr)
+          break
       if value is None:
         return
       contexted[0] = True
@@ -437,12 +488,13 @@ class ActionLogger(Logger):
     """The test results.
 
     Returns:
-      A dict containing STATUS.PASS, STATUS.ERROR, and STATUS.FAIL.
+      A dict containing STATUS.PASS, STATUS.ERROR, STATUS.FAIL, and 'total'.
     """
     return {
         STATUS.PASS: self._passed,
         STATUS.ERROR: self._errored,
         STATUS.FAIL: self._failed,
+        'total': self._total,
     }
 
   def Exception(self, exctype, exception, tb):
@@ -483,7 +535,11 @@ def WriteBackmatter(writers, args):
   total = 0
   passed = 0
   errored = 0
-  args.out.write(args.color('\nVr', vroom.color.VIOLET))
+  # Accumulate the whole backmatter and write it once; the per-status 'o's
+  # are colored once each instead of once per file.
+  status_dots = {status: args.color('o', color)
+                 for status, color in COLORS.items()}
+  out = [args.color('\nVr', vroom.color.VIOLET)]
   for writer in writers:
     count += 1
     total += writer.Stats()['total']
@@ -492,22 +548,23 @@ def WriteBackmatter(writers, args):
       passed += 1
     elif status == STATUS.ERROR:
       errored += 1
-    args.out.write(args.color('o', COLORS[status]))
-  args.out.write(args.color('m\n', vroom.color.VIOLET))
+    out.append(status_dots[status])
+  out.append(args.color('m\n', vroom.color.VIOLET))
   plural = '' if total == 1 else 's'
-  args.out.write('Ran %d test%s in %d files. ' % (total, plural, count))
+  out.append('Ran %d test%s in %d files. ' % (total, plural, count))
   if passed == count:
-    args.out.write('Everything is ')
-    args.out.write(args.color('OK', COLORS[STATUS.PASS]))
-    args.out.write('.')
+    out.append('Everything is ')
+    out.append(args.color('OK', COLORS[STATUS.PASS]))
+    out.append('.')
   else:
-    args.out.write(args.color('%d passed' % passed, COLORS[STATUS.PASS]))
-    args.out.write(', ')
-    args.out.write(args.color('%d errored' % errored, COLORS[STATUS.ERROR]))
-    args.out.write(', ')
+    out.append(args.color('%d passed' % passed, COLORS[STATUS.PASS]))
+    out.append(', ')
+    out.append(args.color('%d errored' % errored, COLORS[STATUS.ERROR]))
+    out.append(', ')
     failed = count - passed - errored
-    args.out.write(args.color('%d failed' % failed, COLORS[STATUS.FAIL]))
-  args.out.write('\n')
+    out.append(args.color('%d failed' % failed, COLORS[STATUS.FAIL]))
+  out.append('\n')
+  args.out.write(''.join(out))
 
 
 def PrefixWithIndex(logs):
@@ -534,17 +591,17 @@ def PrefixWithIndex(logs):
   logs = list(logs)
   while logs and logs[-1] is None:
     logs.pop()
-  # Gods, I love this line. It creates a formatter that pads a number out to
-  # match the largest number necessary to index all the non-null lines in logs.
-  numberifier = '%%0%dd' % len(str(len(list(filter(bool, logs)))))
+  # Pad each number out to match the largest number necessary to index all
+  # the non-null lines in logs. Counted in one pass rather than materializing
+  # a filtered copy; zfill beats rebuilding a %0Nd formatter.
+  width = len(str(sum(1 for log in logs if log)))
   adjustment = 0
   for (i, log) in enumerate(logs):
     if log is None:
       adjustment += 1
       yield ''
     else:
-      index = numberifier % (i + 1 - adjustment)
-      yield '%s\t%s' % (index, log)
+      yield '%s\t%s' % (str(i + 1 - adjustment).zfill(width), log)
 
 
 def ErrorContextPrinter(header, empty, modifier=None, singleton=None):
@@ -1,37 +1,41 @@
 """Result type."""
 
-from collections import namedtuple
-from enum import Enum
+# Status sentinels. Plain ints compare faster than Enum members, and Result
+# construction is on the per-command hot path.
+_RESULT = 0
+_ERROR = 1
 
-class ResultType(Enum):
-  result = 1
-  error = 2
 
-# Inherit from namedtuple so we get an immutable value.
-class Result(namedtuple('Result', ['status', 'value'])):
+class Result(object):
   """Holds the result or error of a function call.
 
-  status should be one of ResultType.result or ResultType.error
+  status should be one of the module's _RESULT or _ERROR sentinels; use the
+  classmethod factories rather than constructing directly.
   """
 
+  __slots__ = ('status', 'value')
+
+  def __init__(self, status, value):
+    self.status = status
+    self.value = value
+
   @classmethod
   def Result(cls, value):
-    return super(Result, cls).__new__(
-        cls, status=ResultType.result, value=value)
+    return cls(_RESULT, value)
 
   @classmethod
   def Error(cls, value):
-    return super(Result, cls).__new__(cls, status=ResultType.error, value=value)
+    return cls(_ERROR, value)
 
   @classmethod
   def Success(cls):
     """Used to indicate success when the actual value is irrelevant."""
-    return super(Result, cls).__new__(cls, status=ResultType.result, value=True)
+    return cls(_RESULT, True)
 
   def IsError(self):
-    return self.status is ResultType.error
+    return self.status == _ERROR
 
   def IsSignificant(self):
-    if self.status is ResultType.result:
+    if self.status == _RESULT:
       return False
     return self.value.IsSignificant()
@@ -35,6 +35,19 @@ class Vroom(object):
     # Whether this vroom instance has left the terminal in an unknown state.
     self.dirty = False
     self.env = vroom.environment.Environment(filename, args)
+    # One dict lookup per parsed line in Run, instead of walking an
+    # if/elif chain over every action type.
+    self._dispatch = {
+        vroom.actions.ACTION.PASS: self._HandlePass,
+        vroom.actions.ACTION.TEXT: self._HandleText,
+        vroom.actions.ACTION.COMMAND: self._HandleCommand,
+        vroom.actions.ACTION.INPUT: self._HandleInput,
+        vroom.actions.ACTION.MESSAGE: self._HandleMessage,
+        vroom.actions.ACTION.SYSTEM: self._HandleSystem,
+        vroom.actions.ACTION.HIJACK: self._HandleHijack,
+        vroom.actions.ACTION.DIRECTIVE: self._HandleDirective,
+        vroom.actions.ACTION.OUTPUT: self._HandleOutput,
+    }
     self.ResetCommands()
 
   def ResetCommands(self):
@@ -89,6 +102,8 @@ class Vroom(object):
         if not self.env.vim.Quit():
           self.dirty = True
           self.env.vim.Kill()
+      # All verification is done; the fake shell bridge fd can go.
+      self.env.shell.Close()
     status = self.env.writer.Status()
     if status != vroom.output.STATUS.PASS and self.env.args.interactive:
       self.env.vim.Output(self.env.writer)
@@ -120,6 +135,51 @@ class Vroom(object):
     self.ExecuteCommands()
     function(*args, **kwargs)
 
+  def _HandlePass(self, line, controls):
+    # Line breaks send you back to the top of the buffer.
+    self.env.buffer.Unload()
+    # Line breaks distinguish between consecutive system hijacks.
+    self.GetCommand().LineBreak()
+
+  def _HandleText(self, line, controls):
+    self.PushCommand('i%s<ESC>' % line, **controls)
+
+  def _HandleCommand(self, line, controls):
+    self.PushCommand(':%s<CR>' % line, **controls)
+
+  def _HandleInput(self, line, controls):
+    self.PushCommand(line, **controls)
+
+  def _HandleMessage(self, line, controls):
+    self.GetCommand().ExpectMessage(line, **controls)
+
+  def _HandleSystem(self, line, controls):
+    self.GetCommand().ExpectSyscall(line, **controls)
+
+  def _HandleHijack(self, line, controls):
+    self.GetCommand().RespondToSyscall(line, **controls)
+
+  def _HandleDirective(self, line, controls):
+    if line == vroom.actions.DIRECTIVE.CLEAR:
+      self.ExecuteCommands()
+      self.env.writer.actions.Log(vroom.test.RESULT.PASSED, self._lineno)
+      self.env.vim.Clear()
+    elif line == vroom.actions.DIRECTIVE.END:
+      self.Test(self.env.buffer.EnsureAtEnd, **controls)
+    elif line == vroom.actions.DIRECTIVE.MESSAGES:
+      self.ExecuteCommands()
+      strictness = controls.get('messages') or self._message_strictness
+      self.env.message_strictness = strictness
+    elif line == vroom.actions.DIRECTIVE.SYSTEM:
+      self.ExecuteCommands()
+      strictness = controls.get('system') or self._system_strictness
+      self.env.system_strictness = strictness
+    else:
+      raise vroom.ConfigurationError('Unrecognized directive "%s"' % line)
+
+  def _HandleOutput(self, line, controls):
+    self.Test(self.env.buffer.Verify, line, **controls)
+
   def Run(self, lines):
     """Runs a vroom file.
 
@@ -127,45 +187,12 @@ class Vroom(object):
       lines: List of lines in the file.
     """
     actions = list(vroom.actions.Parse(lines))
+    dispatch = self._dispatch
     for (self._lineno, action, line, controls) in actions:
-      if action == vroom.actions.ACTION.PASS:
-        # Line breaks send you back to the top of the buffer.
-        self.env.buffer.Unload()
-        # Line breaks distinguish between consecutive system hijacks.
-        self.GetCommand().LineBreak()
-      elif action == vroom.actions.ACTION.TEXT:
-        self.PushCommand('i%s<ESC>' % line, **controls)
-      elif action == vroom.actions.ACTION.COMMAND:
-        self.PushCommand(':%s<CR>' % line, **controls)
-      elif action == vroom.actions.ACTION.INPUT:
-        self.PushCommand(line, **controls)
-      elif action == vroom.actions.ACTION.MESSAGE:
-        self.GetCommand().ExpectMessage(line, **controls)
-      elif action == vroom.actions.ACTION.SYSTEM:
-        self.GetCommand().ExpectSyscall(line, **controls)
-      elif action == vroom.actions.ACTION.HIJACK:
-        self.GetCommand().RespondToSyscall(line, **controls)
-      elif action == vroom.actions.ACTION.DIRECTIVE:
-        if line == vroom.actions.DIRECTIVE.CLEAR:
-          self.ExecuteCommands()
-          self.env.writer.actions.Log(vroom.test.RESULT.PASSED, self._lineno)
-          self.env.vim.Clear()
-        elif line == vroom.actions.DIRECTIVE.END:
-          self.Test(self.env.buffer.EnsureAtEnd, **controls)
-        elif line == vroom.actions.DIRECTIVE.MESSAGES:
-          self.ExecuteCommands()
-          strictness = controls.get('messages') or self._message_strictness
-          self.env.message_strictness = strictness
-        elif line == vroom.actions.DIRECTIVE.SYSTEM:
-          self.ExecuteCommands()
-          strictness = controls.get('system') or self._system_strictness
-          self.env.system_strictness = strictness
-        else:
-          raise vroom.ConfigurationError('Unrecognized directive "%s"' % line)
-      elif action == vroom.actions.ACTION.OUTPUT:
-        self.Test(self.env.buffer.Verify, line, **controls)
-      else:
+      handler = dispatch.get(action)
+      if handler is None:
         raise vroom.ConfigurationError('Unrecognized action "%s"' % action)
+      handler(line, controls)
     self.ExecuteCommands()
     self.env.writer.actions.Log(vroom.test.RESULT.PASSED, self._lineno or 0)
     self.env.vim.Quit()
@@ -3,8 +3,9 @@ import json
 import os
 import os.path
 import pickle
-import pipes
 import re
+import shlex
+import struct
 import tempfile
 
 import vroom
@@ -19,9 +20,7 @@ from vroom.result import Result
 
 VROOMFILE_VAR = 'VROOMFILE'
 VROOMDIR_VAR = 'VROOMDIR'
-LOG_FILENAME_VAR = 'VROOM_SHELL_LOGFILE'
-CONTROL_FILENAME_VAR = 'VROOM_SHELL_CONTROLLFILE'
-ERROR_FILENAME_VAR = 'VROOM_SHELL_ERRORFILE'
+BRIDGE_FILENAME_VAR = 'VROOM_SHELL_BRIDGE'
 
 CONTROL = vroom.Specification(
     EXPECT='expect',
@@ -39,33 +38,157 @@ OUTCHANNEL = vroom.Specification(
 
 DEFAULT_MODE = vroom.controls.MODE.REGEX
 
+# Stand-in pattern for hijacks with no regex expectation to bind against.
+_MATCH_ANY = re.compile(r'^.*$')
 
-def Load(filename):
-  """Loads a shell file into python space.
+# The channels whose responses are lists of lines (everything but STATUS).
+_LINE_CHANNELS = frozenset((
+    OUTCHANNEL.COMMAND,
+    OUTCHANNEL.STDOUT,
+    OUTCHANNEL.STDERR))
+
+# The bridge files are written and read on every shell call; the binary
+# protocol is both smaller and faster to (de)serialize than the default.
+_PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+# All bridge traffic shares one file of tagged, length-prefixed pickle frames.
+# Both sides append; readers demultiplex by stream tag from a byte offset, so
+# nothing is ever deserialized twice and only one fd/pathname is needed.
+LOG_STREAM = 0
+CONTROL_STREAM = 1
+ERROR_STREAM = 2
+_FRAME_HEADER = struct.Struct('<BI')
+# The file starts with the control read cursor: the byte offset of the first
+# unconsumed control frame. The fake shell consumes a control by advancing it.
+_CURSOR_HEADER = struct.Struct('<Q')
+
+
+def InitBridge(filename):
+  """Resets a bridge file to no frames and an empty control queue.
 
   Args:
-    filename: The shell file to load.
-  Returns:
-    The file contents.
-  Raises:
-    FakeShellNotWorking
+    filename: The bridge file to initialize.
   """
+  with open(filename, 'wb') as f:
+    f.write(_CURSOR_HEADER.pack(_CURSOR_HEADER.size))
+
+
+def Append(filename, stream, records):
+  """Appends records to one stream of a bridge file.
+
+  Args:
+    filename: The bridge file to append to.
+    stream: The stream tag to file the records under.
+    records: An iterable of picklable records.
+  """
+  with open(filename, 'ab') as f:
+    for record in records:
+      data = pickle.dumps(record, _PICKLE_PROTOCOL)
+      f.write(_FRAME_HEADER.pack(stream, len(data)) + data)
+
+
+def ControlCursor(filename):
+  """Reads the offset of the first unconsumed control in a bridge file."""
   try:
     with open(filename, 'rb') as f:
-      return pickle.load(f)
+      return _CURSOR_HEADER.unpack(f.read(_CURSOR_HEADER.size))[0]
   except IOError:
     raise FakeShellNotWorking
 
 
-def Send(filename, data):
-  """Sends python data to a shell file.
+def SetControlCursor(filename, offset):
+  """Marks all controls before the given offset in a bridge file consumed."""
+  with open(filename, 'r+b') as f:
+    f.write(_CURSOR_HEADER.pack(offset))
+
+
+def NextControl(filename, offset):
+  """Finds the first unconsumed control in a bridge file.
 
   Args:
-    filename: The shell file to send to.
-    data: The python data to send.
+    filename: The bridge file to scan.
+    offset: The byte offset to scan from (normally the control cursor).
+  Returns:
+    (control, end): The control record (None if there is none pending) and
+        the offset just past its frame, for SetControlCursor on consumption.
   """
-  with open(filename, 'wb') as f:
-    pickle.dump(data, f)
+  with open(filename, 'rb') as f:
+    f.seek(offset)
+    while True:
+      header = f.read(_FRAME_HEADER.size)
+      if len(header) < _FRAME_HEADER.size:
+        return None, offset
+      stream, length = _FRAME_HEADER.unpack(header)
+      if stream == CONTROL_STREAM:
+        return pickle.loads(f.read(length)), f.tell()
+      f.seek(length, 1)
+      offset = f.tell()
+
+
+# The fake shell is a fresh process per call and must reopen the bridge by
+# name, but the Communicator lives for the whole test: it holds one fd open
+# and uses positional reads and writes through these helpers instead of
+# paying an open()/close() per transfer.
+
+
+def _AppendFd(fd, stream, records):
+  """Appends records to one stream of an open bridge fd."""
+  frames = []
+  for record in records:
+    data = pickle.dumps(record, _PICKLE_PROTOCOL)
+    frames.append(_FRAME_HEADER.pack(stream, len(data)) + data)
+  os.lseek(fd, 0, os.SEEK_END)
+  os.write(fd, b''.join(frames))
+
+
+def _ReadFd(fd, offset):
+  """Reads the frames in an open bridge fd, starting at a byte offset.
+
+  Args:
+    fd: The bridge file descriptor.
+    offset: The byte offset of the first frame to read.
+  Returns:
+    (frames, end): A list of (stream, record) pairs and the offset just past
+        the last complete frame.
+  Raises:
+    FakeShellNotWorking
+  """
+  pos = offset
+  chunks = []
+  try:
+    while True:
+      chunk = os.pread(fd, 65536, pos)
+      if not chunk:
+        break
+      chunks.append(chunk)
+      pos += len(chunk)
+  except OSError:
+    raise FakeShellNotWorking
+  data = b''.join(chunks)
+  frames = []
+  parsed = 0
+  header_size = _FRAME_HEADER.size
+  while parsed + header_size <= len(data):
+    stream, length = _FRAME_HEADER.unpack_from(data, parsed)
+    end = parsed + header_size + length
+    if end > len(data):
+      break
+    frames.append((stream, pickle.loads(data[parsed + header_size:end])))
+    parsed = end
+  return frames, offset + parsed
+
+
+def _ControlCursorFd(fd):
+  """Reads the control cursor through an open bridge fd."""
+  try:
+    return _CURSOR_HEADER.unpack(os.pread(fd, _CURSOR_HEADER.size, 0))[0]
+  except OSError:
+    raise FakeShellNotWorking
+
+
+def _SetControlCursorFd(fd, offset):
+  """Writes the control cursor through an open bridge fd."""
+  os.pwrite(fd, _CURSOR_HEADER.pack(offset), 0)
 
 
 class Communicator(object):
@@ -76,26 +199,28 @@ class Communicator(object):
     self.writer = writer.syscalls
     self.commands_writer = writer.commands
 
-    _, self.control_filename = tempfile.mkstemp()
-    _, self.log_filename = tempfile.mkstemp()
-    _, self.error_filename = tempfile.mkstemp()
-    Send(self.control_filename, [])
-    Send(self.log_filename, [])
-    Send(self.error_filename, [])
+    _, self.bridge_filename = tempfile.mkstemp()
+    InitBridge(self.bridge_filename)
+    self._bridge_fd = os.open(self.bridge_filename, os.O_RDWR)
 
     self.env = os.environ.copy()
     self.env[VROOMFILE_VAR] = filename
     self.env[VROOMDIR_VAR] = os.path.dirname(filename) or '.'
-    self.env[vroom.shell.LOG_FILENAME_VAR] = self.log_filename
-    self.env[vroom.shell.CONTROL_FILENAME_VAR] = self.control_filename
-    self.env[vroom.shell.ERROR_FILENAME_VAR] = self.error_filename
+    self.env[vroom.shell.BRIDGE_FILENAME_VAR] = self.bridge_filename
 
-    self._copied_logs = 0
+    self._read_offset = _CURSOR_HEADER.size
+    self._shell_errors = []
+    self._unexpected_count = 0
 
   def Control(self, hijacks):
     """Tell the shell the system control specifications."""
-    existing = Load(self.control_filename)
-    Send(self.control_filename, existing + hijacks)
+    _AppendFd(self._bridge_fd, CONTROL_STREAM, hijacks)
+
+  def Close(self):
+    """Releases the bridge file descriptor."""
+    if self._bridge_fd is not None:
+      os.close(self._bridge_fd)
+      self._bridge_fd = None
 
   def Verify(self):
     """Checks that system output was caught and handled satisfactorily.
@@ -107,34 +232,41 @@ class Communicator(object):
     Raises:
       FakeShellNotWorking: If it can't load the shell file.
     """
-    # Copy any new logs into the logger.
-    logs = Load(self.log_filename)
-    for log in logs[self._copied_logs:]:
-      self.writer.Log(log)
-    self._copied_logs = len(logs)
+    # Copy any new logs into the logger; errors accumulate across verifies.
+    frames, self._read_offset = _ReadFd(self._bridge_fd, self._read_offset)
+    for stream, record in frames:
+      if stream == LOG_STREAM:
+        if record.TYPE == vroom.test.LOG.UNEXPECTED:
+          self._unexpected_count += 1
+        self.writer.Log(record)
+      elif stream == ERROR_STREAM:
+        self._shell_errors.append(record)
+    logs = self.writer.Logs()
 
     failures = []
 
     # Check for shell errors.
-    errors = Load(self.error_filename)
-    if errors:
-      failures.append(FakeShellNotWorking(errors))
+    if self._shell_errors:
+      failures.append(FakeShellNotWorking(self._shell_errors))
 
     commands_logs = self.commands_writer.Logs()
 
     # Check that all controls have been handled.
-    controls = Load(self.control_filename)
+    cursor = _ControlCursorFd(self._bridge_fd)
+    pending, end = _ReadFd(self._bridge_fd, cursor)
+    controls = [record for stream, record in pending
+                if stream == CONTROL_STREAM]
     if controls:
-      Send(self.control_filename, [])
+      _SetControlCursorFd(self._bridge_fd, end)
       missed = controls[0]
       if missed.expectation:
         failures.append(SystemNotCalled(logs, controls, commands_logs))
       failures.append(NoChanceForResponse(logs, missed, commands_logs))
 
-    # Check for unexpected calls, if they user is into that.
+    # Check for unexpected calls, if they user is into that. The count is
+    # maintained as logs arrive, so this check never rescans old logs.
     if self.vroom_env.system_strictness == STRICTNESS.STRICT:
-      logs = self.writer.Logs()
-      if [log for log in logs if log.TYPE == vroom.test.LOG.UNEXPECTED]:
+      if self._unexpected_count:
         failures.append(UnexpectedSystemCalls(logs, commands_logs))
 
     if failures:
@@ -175,9 +307,10 @@ class Hijack(object):
   def __init__(self, fakecmd, expectation=None, mode=None):
     self.closed = False
     self.fakecmd = fakecmd
-    self.response = {}
+    self.response = {channel: [] for channel in _LINE_CHANNELS}
     self.expectation = expectation
     self.mode = mode or DEFAULT_MODE
+    self._match_regex = None
 
   def Response(self, command):
     """Returns the command that should be done in place of the true command.
@@ -193,32 +326,48 @@ class Hijack(object):
       if not vroom.test.Matches(self.expectation, self.mode, command):
         return False
 
-    # We don't want to do this on init because regexes don't repr() as nicely as
-    # strings do.
-    if self.expectation and self.mode == vroom.controls.MODE.REGEX:
-      try:
-        match_regex = re.compile(self.expectation)
-      except re.error as e:
-        raise vroom.ParseError("Can't match command. Invalid regex. %s'" % e)
-    else:
-      match_regex = re.compile(r'^.*$')
+    # We don't want to do this on init because regexes don't repr() as nicely
+    # as strings do. Compiled at most once per instance, though; reused when
+    # the same hijack sees many commands.
+    match_regex = self._match_regex
+    if match_regex is None:
+      if self.expectation and self.mode == vroom.controls.MODE.REGEX:
+        try:
+          match_regex = re.compile(self.expectation)
+        except re.error as e:
+          raise vroom.ParseError("Can't match command. Invalid regex. %s'" % e)
+      else:
+        match_regex = _MATCH_ANY
+      self._match_regex = match_regex
 
     # The actual response won't be exactly like the internal response, because
     # we've got to do some regex group binding magic.
     response = {}
 
+    # With the match-anything pattern, substitution replaces the whole command
+    # with the response line, so a line with no escapes to expand is its own
+    # result and the regex engine can be skipped entirely.
+    verbatim = match_regex is _MATCH_ANY
+
     # Expand all of the responders that want to be bound to the regex.
     for channel in (
         OUTCHANNEL.COMMAND,
         OUTCHANNEL.STDOUT,
         OUTCHANNEL.STDERR):
-      for line in self.response.get(channel, []):
+      lines = self.response[channel]
+      if not lines:
+        continue
+      bound = []
+      for line in lines:
+        if verbatim and '\\' not in line:
+          bound.append(line)
+          continue
         # We do an re.sub() regardless of whether the control was bound as
         # a regex: this forces you to escape consistently between all match
         # groups, which will help prevent your tests from breaking if you later
         # switch the command matching to regex from verbatim/glob.
         try:
-          line = match_regex.sub(line, command)
+          bound.append(match_regex.sub(line, command))
         except re.error as e:
           # 'invalid group reference' is the expected message here.
           # Unfortunately the python re module doesn't differentiate its
@@ -228,7 +377,7 @@ class Hijack(object):
                 'Substitution error. '
                 'Ensure that matchgroups (such as \\1) are escaped.')
           raise vroom.ParseError('Substitution error: %s.' % e)
-        response.setdefault(channel, []).append(line)
+      response[channel] = bound
 
     # The return status can't be regex-bound.
     if OUTCHANNEL.STATUS in self.response:
@@ -236,7 +385,9 @@ class Hijack(object):
 
     # If we actually want to do anything, call out to the responder.
     if response:
-      return '%s %s' % (self.fakecmd, pipes.quote(json.dumps(response)))
+      return '%s %s' % (
+          self.fakecmd,
+          shlex.quote(json.dumps(response, separators=(',', ':'))))
     return command
 
   def Respond(self, line, channel=None):
@@ -248,12 +399,8 @@ class Hijack(object):
     """
     if channel is None:
       channel = OUTCHANNEL.STDOUT
-    if channel == OUTCHANNEL.COMMAND:
-      self.response.setdefault(OUTCHANNEL.COMMAND, []).append(line)
-    elif channel == OUTCHANNEL.STDOUT:
-      self.response.setdefault(OUTCHANNEL.STDOUT, []).append(line)
-    elif channel == OUTCHANNEL.STDERR:
-      self.response.setdefault(OUTCHANNEL.STDERR, []).append(line)
+    if channel in _LINE_CHANNELS:
+      self.response[channel].append(line)
     elif channel == OUTCHANNEL.STATUS:
       if OUTCHANNEL.STATUS in self.response:
         raise vroom.ParseError('A system call cannot return two statuses!')
@@ -274,11 +421,11 @@ class Hijack(object):
     if self.expectation is not None:
       out += ' EXPECT:\t%s (%s mode)\n' % (self.expectation, self.mode)
     rejoiner = '\n%07s\t' % ''
-    if OUTCHANNEL.COMMAND in self.response:
+    if self.response[OUTCHANNEL.COMMAND]:
       out += 'COMMAND:\t%s\n' % rejoiner.join(self.response[OUTCHANNEL.COMMAND])
-    if OUTCHANNEL.STDOUT in self.response:
+    if self.response[OUTCHANNEL.STDOUT]:
       out += ' STDOUT:\t%s\n' % rejoiner.join(self.response[OUTCHANNEL.STDOUT])
-    if OUTCHANNEL.STDERR in self.response:
+    if self.response[OUTCHANNEL.STDERR]:
       out += ' STDERR:\t%s\n' % rejoiner.join(self.response[OUTCHANNEL.STDERR])
     if 'status' in self.response:
       out += ' STATUS:\t%s' % self.response['status']
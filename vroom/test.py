@@ -1,5 +1,6 @@
 """Vroom test utilities."""
 import fnmatch
+import functools
 import re
 import traceback
 
@@ -56,14 +57,31 @@ def Matches(request, mode, data):
   Returns:
     Whether or not the data checks out.
   """
+  return Matcher(request, mode)(data)
+
+
+@functools.lru_cache(maxsize=256)
+def Matcher(request, mode):
+  """Builds a predicate that checks data against request under mode.
+
+  The predicate is cached per (request, mode), so verifying many lines (or
+  many messages) against the same expectation compiles its pattern only once.
+
+  Args:
+    request: The requested string (likely a line in a vroom file)
+    mode: The match mode (regex|glob|verbatim)
+  Returns:
+    A callable taking the data and returning whether it checks out.
+  """
   if mode is None:
     mode = vroom.controls.DEFAULT_MODE
   if mode == vroom.controls.MODE.VERBATIM:
-    return request == data
-  elif mode == vroom.controls.MODE.GLOB:
-    return fnmatch.fnmatch(data, request)
+    return lambda data: request == data
+  if mode == vroom.controls.MODE.GLOB:
+    match = re.compile(fnmatch.translate(request)).match
   else:
-    return re.match(request + '$', data) is not None
+    match = re.compile(request + '$').match
+  return lambda data: match(data) is not None
 
 
 class Failure(Exception):
@@ -110,15 +128,22 @@ class Failures(Failure):
 class Log(object):
   """A generic log type."""
   TYPE_WIDTH = 10  # UNEXPECTED
+  # Continuation lines get indented to the header column.
+  _LEADER = ('\n%%%ds ' % TYPE_WIDTH) % ''
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    # Makes every header be padded as much as the longest message. Computed
+    # once per subclass rather than on every str().
+    if hasattr(cls, 'TYPE'):
+      cls._HEADER = ('%%%ds' % cls.TYPE_WIDTH) % cls.TYPE.upper()
 
   def __init__(self, message=''):
     self.message = message
 
   def __str__(self):
-    # Makes every header be padded as much as the longest message.
-    header = ('%%%ds' % self.TYPE_WIDTH) % self.TYPE.upper()
-    leader = ('\n%%%ds ' % self.TYPE_WIDTH) % ''
-    return ' '.join((header, leader.join(self.message.split('\n'))))
+    return ' '.join(
+        (self._HEADER, self._LEADER.join(self.message.split('\n'))))
 
 
 class Received(Log):
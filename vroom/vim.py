@@ -1,7 +1,10 @@
 """Vroom vim management."""
 import ast
+import hashlib
 from io import StringIO
 import json
+import os
+import os.path
 import re
 import subprocess
 import tempfile
@@ -21,9 +24,7 @@ QUOTED_STRING_RE = re.compile(r'''
 # to be read. If the user does a sudo install, distutils has no way to make the
 # .vim file actually readable and vroom dies from permission errors.
 # So screw you, python. I'll just hardcode it.
-_, CONFIGFILE = tempfile.mkstemp()
-with open(CONFIGFILE, 'w') as configfile:
-  configfile.write("""
+_VIMSCRIPT = """
 " Prevents your vroom tests from doing nasty things to your system.
 set noswapfile
 
@@ -55,7 +56,39 @@ endfunction
 function! VroomEnd()
   qa!
 endfunction
-""")
+"""
+
+
+def _WriteConfigFile():
+  """Puts the embedded vimscript on disk and returns its path.
+
+  The file is cached under the user's cache directory, keyed by a hash of its
+  contents, so repeated vroom runs skip the write entirely. Falls back to a
+  throwaway tempfile when the cache directory isn't usable.
+  """
+  digest = hashlib.blake2b(
+      _VIMSCRIPT.encode('utf-8'), digest_size=8).hexdigest()
+  cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+      os.path.expanduser('~'), '.cache')
+  path = os.path.join(cache_dir, 'vroom', 'config-%s.vim' % digest)
+  if os.path.isfile(path):
+    return path
+  try:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write-then-rename keeps concurrent vroom processes from sourcing a
+    # half-written file.
+    fd, scratch = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'w') as configfile:
+      configfile.write(_VIMSCRIPT)
+    os.rename(scratch, path)
+  except OSError:
+    _, path = tempfile.mkstemp()
+    with open(path, 'w') as configfile:
+      configfile.write(_VIMSCRIPT)
+  return path
+
+
+CONFIGFILE = _WriteConfigFile()
 
 
 def DeserializeVimValue(value_str):
@@ -102,9 +135,35 @@ class Communicator(object):
         '--servername', args.servername,
         '-c', 'set shell=' + args.shell,
         '-c', 'source %s' % CONFIGFILE]
+    # Every client invocation starts with the same three words.
+    self._client_command = ['vim', '--servername', args.servername]
     self.env = env
+    self._child_env = self._BuildChildEnv()
     self._cache = {}
 
+  def _BuildChildEnv(self):
+    """Builds the environment for vim client processes.
+
+    Overrides messages generated by the vim client process (in particular, the
+    "No display" message) to be in English so that we can recognise them.
+    We do this by setting both LC_ALL (per POSIX) and LANGUAGE (a GNU gettext
+    extension) to en_US.UTF-8.  (Setting LANG=C would disable localisation
+    entirely, but has the bad side-effect of also setting the character
+    encoding to ASCII, which breaks when the remote side sends a non-ASCII
+    character.)
+
+    Note that this does not affect messages from the vim server process,
+    which should be matched using error codes as usual.
+
+    Returns:
+      The environment dict.
+    """
+    child_env = self.env.copy()
+    child_env.update({
+      'LANGUAGE': 'en_US.UTF-8',
+      'LC_ALL': 'en_US.UTF-8'})
+    return child_env
+
   def Start(self):
     """Starts vim."""
     if not self._IsCurrentDisplayUsable():
@@ -112,12 +171,14 @@ class Communicator(object):
       # connections and not how console vim appears.
       original_display = self.env.get('DISPLAY')
       self.env['DISPLAY'] = ':0'
+      self._child_env = self._BuildChildEnv()
       if not self._IsCurrentDisplayUsable():
         # Restore original display value if ":0" doesn't work, either.
         if original_display is None:
           del self.env['DISPLAY']
         else:
           self.env['DISPLAY'] = original_display
+        self._child_env = self._BuildChildEnv()
       # TODO(dbarnett): Try all values from /tmp/.X11-unix/, etc.
 
     # We do this separately from __init__ so that if it fails, vroom.runner
@@ -154,12 +215,25 @@ class Communicator(object):
       Quit: If vim quit unexpectedly.
     """
     self.writer.Log(command)
-    self.TryToSay([
-        'vim',
-        '--servername', self.args.servername,
-        '--remote-send', command])
+    self.TryToSay(self._client_command + ['--remote-send', command])
     self._cache = {}
-    time.sleep(self.args.delay + extra_delay)
+    if extra_delay:
+      # Extra delay was requested explicitly by the test; honor it as wall
+      # time.
+      time.sleep(extra_delay)
+    if self.args.delay:
+      deadline = time.time() + self.args.delay
+      try:
+        # Vim only answers remote expressions from its main loop, after
+        # pending typeahead has been consumed, so one successful round-trip
+        # means the sent keys have been processed. This turns --delay into an
+        # upper bound instead of a fixed per-command cost.
+        self.Ask('1')
+      except Quit:
+        # Couldn't confirm readiness; fall back to the conservative sleep.
+        remaining = deadline - time.time()
+        if remaining > 0:
+          time.sleep(remaining)
 
   def Ask(self, expression):
     """Asks vim for the result of an expression.
@@ -173,10 +247,8 @@ class Communicator(object):
       BadVimValue if vim returns a value that can't be deserialized.
     """
     try:
-      out = self.TryToSay([
-          'vim',
-          '--servername', self.args.servername,
-          '--remote-expr', 'string(%s)' % expression])
+      out = self.TryToSay(
+          self._client_command + ['--remote-expr', 'string(%s)' % expression])
     except ErrorOnExit as e:
       if e.error_text.startswith('E449:'):  # Invalid expression received
         raise InvalidExpression(expression)
@@ -185,6 +257,22 @@ class Communicator(object):
     # already.
     return DeserializeVimValue(out.rstrip())
 
+  def AskMany(self, expressions):
+    """Asks vim for the results of several expressions in one round-trip.
+
+    Each Ask costs a whole client process; evaluating a vimscript list gets
+    any number of answers for the price of one.
+
+    Args:
+      expressions: A list of expressions to evaluate.
+    Returns:
+      A list with one return value per expression.
+    Raises:
+      Quit if vim quit unexpectedly.
+      BadVimValue if vim returns a value that can't be deserialized.
+    """
+    return self.Ask('[%s]' % ', '.join(expressions))
+
   def GetCurrentLine(self):
     """Figures out what line the cursor is on.
 
@@ -210,6 +298,13 @@ class Communicator(object):
       The buffer lines.
     """
     if number not in self._cache:
+      if number is None and 'line' not in self._cache:
+        # The cursor position is nearly always wanted right after the current
+        # buffer's contents, so fetch both in one round-trip.
+        lines, self._cache['line'] = self.AskMany(
+            ["getbufline('%', 1, '$')", "line('.')"])
+        self._cache[number] = lines
+        return lines
       num = "'%'" if number is None else number
       cmd = "getbufline(%s, 1, '$')" % num
       self._cache[number] = self.Ask(cmd)
@@ -225,9 +320,12 @@ class Communicator(object):
     # (When checking a (msg) output line, first we check the messages then we
     # load the buffer.) Cleans up --dump-commands a bit.
     if 'msg' not in self._cache:
-      cmd = "VroomExecute('silent! messages')"
-      # Add trailing newline as workaround for http://bugs.python.org/issue7638.
-      self._cache['msg'] = (self.Ask(cmd) + '\n').splitlines()
+      # Split into lines server-side (keepempty, to preserve blank messages)
+      # so the reply is already a list literal instead of one big string that
+      # python has to reallocate and split. This also sidesteps the trailing
+      # newline workaround for http://bugs.python.org/issue7638.
+      cmd = "split(VroomExecute('silent! messages'), '\\n', 1)"
+      self._cache['msg'] = self.Ask(cmd)
     return self._cache['msg']
 
   def Clear(self):
@@ -287,26 +385,11 @@ class Communicator(object):
     if hasattr(self, 'process') and self.process.poll() is not None:
       raise ServerQuit()
 
-    # Override messages generated by the vim client process (in particular, the
-    # "No display" message) to be in English so that we can recognise them.
-    # We do this by setting both LC_ALL (per POSIX) and LANGUAGE (a GNU gettext
-    # extension) to en_US.UTF-8.  (Setting LANG=C would disable localisation
-    # entirely, but has the bad side-effect of also setting the character
-    # encoding to ASCII, which breaks when the remote side sends a non-ASCII
-    # character.)
-    #
-    # Note that this does not affect messages from the vim server process,
-    # which should be matched using error codes as usual.
-    env = self.env.copy()
-    env.update({
-      'LANGUAGE': 'en_US.UTF-8',
-      'LC_ALL': 'en_US.UTF-8'})
-
     out, err = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        env=env).communicate()
+        env=self._child_env).communicate()
     if out is None:
       raise Quit('Vim could not respond to query "%s"' % ' '.join(cmd[3:]))
     if err:
@@ -318,6 +401,11 @@ class Communicator(object):
     return out.decode('utf-8')
 
 
+# One shared encoder: skips json.dumps's per-call argument checks, which adds
+# up when every failure line is shipped to vim through VroomDie.
+_JSON_ENCODE = json.JSONEncoder().encode
+
+
 def VimscriptString(string):
   """Escapes & quotes a string for usage as a vimscript string literal.
 
@@ -332,7 +420,12 @@ def VimscriptString(string):
   Returns:
     The escaped string, in double quotes.
   """
-  return json.dumps(string)
+  return _JSON_ENCODE(string)
+
+
+# Characters that open a context in SplitCommand, and what closes each one.
+_SPECIALS = frozenset('\\\'("')
+_CLOSERS = {'"': '"', "'": "'", '(': ')'}
 
 
 def SplitCommand(string):
@@ -373,19 +466,24 @@ def SplitCommand(string):
   """
   if string.startswith('('):
     stack = []
+    push = stack.append
+    pop = stack.pop
+    # Track the top of the stack in a local: one comparison against a dict
+    # lookup per character instead of four stack[-1] probes.
+    top = None
     for i, char in enumerate(string):
-      if stack and stack[-1] == '\\':
-        stack.pop()
-      elif stack and stack[-1] == '"' and char == '"':
-        stack.pop()
-      elif stack and stack[-1] == "'" and char == "'":
-        stack.pop()
-      elif stack and stack[-1] == '(' and char == ')':
-        stack.pop()
-      elif char in '\\\'("':
-        stack.append(char)
-      if not stack:
-        return (string[1:i], lambda cmd: (string[0] + cmd + string[i:]))
+      if top == '\\':
+        pop()
+        top = stack[-1] if stack else None
+      elif char == _CLOSERS.get(top):
+        pop()
+        if stack:
+          top = stack[-1]
+        else:
+          return (string[1:i], lambda cmd: (string[0] + cmd + string[i:]))
+      elif char in _SPECIALS:
+        push(char)
+        top = char
   return (string, lambda cmd: cmd)
 
 